@@ -12,8 +12,26 @@ from typing import Any
 from astrbot.api import logger
 import httpx
 import asyncio
+import importlib.util
+import logging
+import random
 import time
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # orjson 为可选依赖，未安装时回退到标准库
+    import json
+
+    _json_loads = json.loads
+
+# HTTP/2 需要 h2 依赖（httpx[http2]），未安装时使用 HTTP/1.1
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# 失败响应写入日志的最大字节数
+_ERROR_BODY_LIMIT = 512
+
 
 class MoviepilotApi:
     """MoviePilot API 客户端"""
@@ -29,22 +47,39 @@ class MoviepilotApi:
         self.mp_username = config.get("mp_username", "")
         self.mp_password = config.get("mp_password", "")
         self.timeout = config.get("mp_timeout", 120)
+        self.connect_timeout = config.get("mp_connect_timeout", 10)
         self.max_retries = config.get("mp_max_retries", 3)
         self.retry_delay = config.get("mp_retry_delay", 1)
+        self.max_retry_delay = config.get("mp_max_retry_delay", 30)
+        # 配置在运行期间不会变化，验证结果只计算一次
+        self._config_valid, self._config_error = self._compute_validation()
+
+        # 共享的 HTTP 客户端（复用连接池与 TLS 会话）
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=30),
+            http2=_HTTP2_AVAILABLE,
+        )
 
-        # Token 缓存
-        self._cached_token: str | None = None
-        self._token_expires_at: float = 0
-        self._token_lock = asyncio.Lock()
+        # Token 缓存：(访问令牌, 需要刷新的时间, 认证请求头)
+        self._token_cache: tuple[str, float, dict[str, str]] | None = None
+        # 进行中的登录请求，并发的刷新方共享同一结果
+        self._refresh_future: asyncio.Future | None = None
         self._token_buffer = 300  # Token 过期前 5 分钟重新获取
+        self._min_token_refresh = 60  # 两次刷新之间的最短间隔（秒）
 
     def validate_config(self) -> tuple[bool, str]:
         """
-        验证配置是否完整
+        验证配置是否完整（结果在初始化时计算并缓存）
 
         Returns:
             (是否有效, 错误信息)
         """
+        return self._config_valid, self._config_error
+
+    def _compute_validation(self) -> tuple[bool, str]:
+        """检查必填配置项"""
         if not self.base_url:
             return False, "MoviePilot URL 未配置 (mp_url)"
         if not self.mp_username:
@@ -53,21 +88,82 @@ class MoviepilotApi:
             return False, "MoviePilot 密码未配置 (mp_password)"
         return True, ""
 
-    async def _get_mp_token(self) -> str | None:
+    async def close(self) -> None:
+        """关闭共享的 HTTP 客户端"""
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "MoviepilotApi":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def _valid_token_entry(self) -> tuple[str, float, dict[str, str]] | None:
+        """返回仍在有效期内的 Token 缓存条目（无锁读取）"""
+        entry = self._token_cache
+        if entry and time.time() < entry[1]:
+            return entry
+        return None
+
+    def _token_refresh_after(self, expires_in: float) -> float:
         """
-        获取 MoviePilot 访问令牌（带缓存）
+        根据 Token 有效期计算多久后需要刷新
+
+        正常情况下在过期前 _token_buffer 秒刷新；有效期较短时改为半程刷新，
+        且不少于 _min_token_refresh 秒，避免频繁登录，但不会超过有效期本身。
+        """
+        refresh_after = max(
+            expires_in - self._token_buffer,
+            expires_in / 2,
+            self._min_token_refresh,
+        )
+        return min(refresh_after, expires_in)
+
+    def seconds_until_token_refresh(self) -> float:
+        """距离缓存 Token 需要刷新的剩余秒数（无缓存时为 0）"""
+        entry = self._token_cache
+        if not entry:
+            return 0.0
+        return max(entry[1] - time.time(), 0.0)
+
+    async def _get_token_entry(self) -> tuple[str, float, dict[str, str]] | None:
+        """
+        获取 Token 缓存条目，必要时重新登录
+
+        缓存有效时直接返回；需要刷新时，同一时刻只发起一次登录，
+        其余协程等待同一个 Future，避免重复登录。
 
         Returns:
-            访问令牌或 None（获取失败时）
+            (访问令牌, 刷新时间, 认证请求头) 或 None（获取失败时）
         """
-        # 检查缓存是否有效
-        current_time = time.time()
-        async with self._token_lock:
-            if self._cached_token and current_time < (self._token_expires_at - self._token_buffer):
-                logger.debug("使用缓存的 Token")
-                return self._cached_token
+        entry = self._valid_token_entry()
+        if entry:
+            return entry
+
+        if self._refresh_future is not None:
+            logger.debug("等待进行中的 Token 刷新")
+            return await asyncio.shield(self._refresh_future)
+
+        # 从检查缓存到发布 Future 之间没有 await，
+        # 其他协程不可能同时进入登录流程
+        future = asyncio.get_running_loop().create_future()
+        self._refresh_future = future
+        entry = None
+        try:
+            entry = await self._login()
+            return entry
+        finally:
+            # 登录异常或被取消时，等待方收到 None 而不是一直挂起
+            future.set_result(entry)
+            self._refresh_future = None
+
+    async def _login(self) -> tuple[str, float, dict[str, str]] | None:
+        """
+        登录 MoviePilot 并写入 Token 缓存
 
-        # 缓存无效，重新获取
+        Returns:
+            新的 Token 缓存条目或 None（登录失败时）
+        """
         if not self.mp_password:
             logger.error("MoviePilot 密码不能为空")
             return None
@@ -82,8 +178,9 @@ class MoviepilotApi:
             "password": self.mp_password,
         }
 
+        current_time = time.time()
         data = await self._request(
-            url=self.base_url + api_path,
+            path=api_path,
             method="POST_FORM",
             headers=headers,
             data=form_data,
@@ -94,13 +191,36 @@ class MoviepilotApi:
             token = data["access_token"]
             # 解析 token 获取过期时间（JWT 格式）
             expires_in = data.get("expires_in", 3600)  # 默认 1 小时
-            async with self._token_lock:
-                self._cached_token = token
-                self._token_expires_at = current_time + expires_in
+            auth_headers = {
+                "Authorization": f"Bearer {token}",
+                "User-Agent": "AstrBot-MP-Plugin/1.2.0",
+            }
+            # 整体替换元组，读取方不会看到不一致的状态
+            entry = (token, current_time + self._token_refresh_after(expires_in), auth_headers)
+            self._token_cache = entry
             logger.info("Token 获取成功，缓存生效")
-            return token
+            return entry
         return None
 
+    async def prefetch_token(self) -> bool:
+        """
+        预先获取 Token（已有有效缓存时不重复登录）
+
+        Returns:
+            是否持有有效 Token
+        """
+        return await self._get_token_entry() is not None
+
+    async def _get_mp_token(self) -> str | None:
+        """
+        获取 MoviePilot 访问令牌（带缓存）
+
+        Returns:
+            访问令牌或 None（获取失败时）
+        """
+        entry = await self._get_token_entry()
+        return entry[0] if entry else None
+
     async def _get_headers(self) -> dict[str, str] | None:
         """
         获取带认证的请求头
@@ -108,31 +228,30 @@ class MoviepilotApi:
         Returns:
             请求头字典或 None（认证失败时）
         """
-        token = await self._get_mp_token()
-        if not token:
+        entry = await self._get_token_entry()
+        if not entry:
             logger.error("访问 MoviePilot 失败，请确认密码或是否开启了两步验证")
             return None
-        return {
-            "Authorization": f"Bearer {token}",
-            "User-Agent": "AstrBot-MP-Plugin/1.2.0",
-        }
+        return entry[2]
 
     async def _request(
         self,
-        url: str,
+        path: str,
         method: str = "GET",
         headers: dict[str, str] | None = None,
         data: dict[str, Any] | None = None,
+        params: dict[str, Any] | None = None,
         use_auth: bool = True,
     ) -> Any | None:
         """
         发送 HTTP 请求（带重试机制）
 
         Args:
-            url: 请求 URL
+            path: 请求路径（相对于 mp_url）
             method: 请求方法 (GET/POST_JSON/POST_FORM)
             headers: 请求头
             data: 请求数据
+            params: URL 查询参数（由 httpx 负责编码）
             use_auth: 是否需要认证
 
         Returns:
@@ -148,54 +267,85 @@ class MoviepilotApi:
                 return None
             headers.update(auth_headers)
 
-        timeout = httpx.Timeout(self.timeout, read=self.timeout)
-
-        logger.debug(f"API 请求: {method} {url}")
+        logger.debug("API 请求: %s %s", method, path)
 
         # 重试逻辑
         last_error = None
         for attempt in range(self.max_retries):
+            retry_after: float | None = None
             try:
-                async with httpx.AsyncClient(timeout=timeout) as client:
-                    if method == "GET":
-                        response = await client.get(url, headers=headers)
-                    elif method == "POST_JSON":
-                        response = await client.post(url, headers=headers, json=data)
-                    elif method == "POST_FORM":
-                        response = await client.post(url, headers=headers, data=data)
-                    else:
-                        logger.error(f"不支持的请求方法: {method}")
-                        return None
-
-                    if response.status_code == 200:
-                        return response.json()
-                    elif response.status_code == 401:
-                        logger.error("认证失败 (401)，请检查用户名密码")
-                        # 清除缓存，下次重新获取
-                        async with self._token_lock:
-                            self._cached_token = None
-                            self._token_expires_at = 0
-                        return None
-                    else:
-                        logger.warning(f"请求失败 ({response.status_code}): {response.text}")
-                        last_error = f"HTTP {response.status_code}"
+                if method == "GET":
+                    response = await self._client.get(path, headers=headers, params=params)
+                elif method == "POST_JSON":
+                    response = await self._client.post(path, headers=headers, json=data)
+                elif method == "POST_FORM":
+                    response = await self._client.post(path, headers=headers, data=data)
+                else:
+                    logger.error("不支持的请求方法: %s", method)
+                    return None
+
+                if response.status_code == 200:
+                    return _json_loads(response.content)
+                elif response.status_code == 401:
+                    logger.error("认证失败 (401)，请检查用户名密码")
+                    # 清除缓存，下次重新获取
+                    self._token_cache = None
+                    return None
+                elif 400 <= response.status_code < 500 and response.status_code != 429:
+                    # 客户端错误重试无意义，直接返回
+                    self._log_failed_response(response)
+                    return None
+                else:
+                    self._log_failed_response(response)
+                    last_error = f"HTTP {response.status_code}"
+                    if response.status_code == 429:
+                        retry_after = self._parse_retry_after(response)
 
             except httpx.TimeoutException as e:
                 last_error = f"请求超时: {e}"
-                logger.warning(f"请求超时 (尝试 {attempt + 1}/{self.max_retries}): {url}")
+                logger.warning("请求超时 (尝试 %s/%s): %s", attempt + 1, self.max_retries, path)
             except httpx.ConnectError as e:
                 last_error = f"连接错误: {e}"
-                logger.warning(f"连接失败 (尝试 {attempt + 1}/{self.max_retries}): {url}")
+                logger.warning("连接失败 (尝试 %s/%s): %s", attempt + 1, self.max_retries, path)
             except Exception as e:
                 last_error = f"请求异常: {e}"
-                logger.warning(f"请求异常 (尝试 {attempt + 1}/{self.max_retries}): {e}")
+                logger.warning("请求异常 (尝试 %s/%s): %s", attempt + 1, self.max_retries, e)
 
             if attempt < self.max_retries - 1:
-                await asyncio.sleep(self.retry_delay * (attempt + 1))
-
-        logger.error(f"请求最终失败 ({self.max_retries} 次重试): {last_error}")
+                if retry_after is not None:
+                    delay = min(retry_after, self.max_retry_delay)
+                else:
+                    # 指数退避 + 随机抖动，避免多个请求同步重试
+                    delay = min(self.retry_delay * (2**attempt), self.max_retry_delay)
+                    delay *= 0.5 + random.random()
+                await asyncio.sleep(delay)
+
+        logger.error("请求最终失败 (%s 次重试): %s", self.max_retries, last_error)
         return None
 
+    @staticmethod
+    def _log_failed_response(response: httpx.Response) -> None:
+        """记录失败响应，仅在日志级别启用时才解码响应体的前 512 字节"""
+        if logger.isEnabledFor(logging.WARNING):
+            body = response.content[:_ERROR_BODY_LIMIT].decode("utf-8", errors="replace")
+            logger.warning("请求失败 (%s): %s", response.status_code, body)
+
+    @staticmethod
+    def _parse_retry_after(response: httpx.Response) -> float | None:
+        """
+        解析 429 响应的 Retry-After 头（仅支持秒数格式）
+
+        Returns:
+            等待秒数或 None（缺失或格式不支持时）
+        """
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            return None
+
     async def search_media_info(self, media_name: str) -> list[dict] | None:
         """
         搜索媒体信息
@@ -206,15 +356,12 @@ class MoviepilotApi:
         Returns:
             搜索结果列表或 None
         """
-        api_path = f"/api/v1/media/search?title={media_name}"
-        try:
-            return await self._request(
-                url=self.base_url + api_path,
-                method="GET",
-            )
-        except Exception as e:
-            logger.error(f"搜索媒体失败: {e}")
-            return None
+        api_path = "/api/v1/media/search"
+        return await self._request(
+            path=api_path,
+            method="GET",
+            params={"title": media_name},
+        )
 
     async def list_all_seasons(self, tmdbid: str | int | None) -> list[dict] | None:
         """
@@ -227,25 +374,25 @@ class MoviepilotApi:
             季度列表或 None
         """
         # 验证 tmdbid
-        if not tmdbid or str(tmdbid) in ("tv", "movie"):
-            logger.warning(f"获取季度列表时收到无效的 TMDB ID: {tmdbid}")
-            return None
-        
-        try:
-            tmdb_id_int = int(tmdbid)
-        except (ValueError, TypeError):
-            logger.warning(f"获取季度列表时 TMDB ID 格式错误: {tmdbid}")
+        if not tmdbid or tmdbid in ("tv", "movie"):
+            logger.warning("获取季度列表时收到无效的 TMDB ID: %s", tmdbid)
             return None
 
+        # 搜索结果中的 tmdb_id 通常已是 int，无需再转换
+        if isinstance(tmdbid, int):
+            tmdb_id_int = tmdbid
+        else:
+            try:
+                tmdb_id_int = int(tmdbid)
+            except (ValueError, TypeError):
+                logger.warning("获取季度列表时 TMDB ID 格式错误: %s", tmdbid)
+                return None
+
         api_path = f"/api/v1/tmdb/seasons/{tmdb_id_int}"
-        try:
-            return await self._request(
-                url=self.base_url + api_path,
-                method="GET",
-            )
-        except Exception as e:
-            logger.error(f"获取季度列表失败: {e}")
-            return None
+        return await self._request(
+            path=api_path,
+            method="GET",
+        )
 
     async def subscribe_movie(self, movie: dict[str, Any]) -> bool:
         """
@@ -258,24 +405,21 @@ class MoviepilotApi:
             是否订阅成功
         """
         api_path = "/api/v1/subscribe/"
+        title = movie.get("title")
         body = {
-            "name": movie.get("title"),
+            "name": title,
             "tmdbid": movie.get("tmdb_id"),
             "type": "电影",
         }
-        try:
-            response = await self._request(
-                url=self.base_url + api_path,
-                method="POST_JSON",
-                data=body,
-            )
-            success = response.get("success", False) if response else False
-            if success:
-                logger.info(f"成功订阅电影: {movie.get('title')}")
-            return success
-        except Exception as e:
-            logger.error(f"订阅电影失败: {e}")
-            return False
+        response = await self._request(
+            path=api_path,
+            method="POST_JSON",
+            data=body,
+        )
+        success = response.get("success", False) if response else False
+        if success:
+            logger.info("成功订阅电影: %s", title)
+        return success
 
     async def subscribe_series(self, movie: dict[str, Any], season: int) -> bool:
         """
@@ -289,24 +433,21 @@ class MoviepilotApi:
             是否订阅成功
         """
         api_path = "/api/v1/subscribe/"
+        title = movie.get("title")
         body = {
-            "name": movie.get("title"),
+            "name": title,
             "tmdbid": movie.get("tmdb_id"),
             "season": season,
         }
-        try:
-            response = await self._request(
-                url=self.base_url + api_path,
-                method="POST_JSON",
-                data=body,
-            )
-            success = response.get("success", False) if response else False
-            if success:
-                logger.info(f"成功订阅电视剧: {movie.get('title')} 第{season}季")
-            return success
-        except Exception as e:
-            logger.error(f"订阅电视剧失败: {e}")
-            return False
+        response = await self._request(
+            path=api_path,
+            method="POST_JSON",
+            data=body,
+        )
+        success = response.get("success", False) if response else False
+        if success:
+            logger.info("成功订阅电视剧: %s 第%s季", title, season)
+        return success
 
     async def get_download_progress(self) -> list[dict] | None:
         """
@@ -316,21 +457,15 @@ class MoviepilotApi:
             下载任务列表或 None
         """
         api_path = "/api/v1/download/"
-        try:
-            data = await self._request(
-                url=self.base_url + api_path,
-                method="GET",
-            )
-            if data is None:
-                return None
-            return data if data else []
-        except Exception as e:
-            logger.error(f"获取下载进度失败: {e}")
+        data = await self._request(
+            path=api_path,
+            method="GET",
+        )
+        if data is None:
             return None
+        return data if data else []
 
     async def clear_token_cache(self) -> None:
         """清除 Token 缓存（用于测试或手动刷新）"""
-        async with self._token_lock:
-            self._cached_token = None
-            self._token_expires_at = 0
+        self._token_cache = None
         logger.info("Token 缓存已清除")
@@ -5,7 +5,8 @@ MoviePilot 订阅插件
 支持搜索订阅影片和查看下载进度。
 """
 
-from typing import Any
+from collections import defaultdict
+from typing import Any, Awaitable, TypeVar
 import asyncio
 
 from astrbot.api.event import filter, AstrMessageEvent
@@ -18,6 +19,82 @@ from astrbot.core.utils.session_waiter import (
 )
 
 from .api import MoviepilotApi
+from .store import create_store
+
+T = TypeVar("T")
+
+# 下载状态图标
+_STATE_ICON = {
+    "downloading": "⬇️",
+    "seeding": "✅",
+    "paused": "⏸️",
+    "error": "❌",
+    "unknown": "❓",
+}
+
+# 预生成的进度条，按填充格数索引
+_BAR_LENGTH = 20
+_BARS = tuple("█" * i + "░" * (_BAR_LENGTH - i) for i in range(_BAR_LENGTH + 1))
+
+# 只读的空字典，用作缺省值以避免重复创建（禁止写入）
+_EMPTY_DICT: dict[str, Any] = {}
+
+# 固定的回复文本，在导入时构建一次
+_DIVIDER = "━━━━━━━━━━━━━━━━━━"
+_PROGRESS_RULE = "=" * 30
+
+_HELP_TEXT = f"""📺 MoviePilot 订阅插件使用帮助
+
+📌 可用命令：
+{_DIVIDER}
+/sub <片名>
+  搜索并订阅影片（支持电影和电视剧）
+  示例：/sub 星际穿越
+
+/download
+  查看当前下载进度
+
+/mp_help
+  显示本帮助信息
+{_DIVIDER}
+
+💡 使用提示：
+• 搜索后回复序号进行订阅
+• 回复 0 取消操作
+• 电视剧会自动列出可选季度
+• 搜索超时时间为 60 秒
+"""
+
+_SEARCH_FOOTER = f"\n\n💡 提示：回复序号订阅（0 取消）\n{_DIVIDER}"
+_SEASON_FOOTER = f"\n\n💡 提示：回复季数数字即可订阅（0 退出）\n{_DIVIDER}"
+_TIMEOUT_MSG = "⏰ 操作超时，已退出选择。"
+_CANCEL_MSG = "❌ 已取消操作。"
+_ERROR_MSG = "❌ 发生错误，请重新尝试。"
+_SUBSCRIBE_UNAVAILABLE_MSG = "❌ 订阅服务暂时不可用，请稍后重试。"
+_SUBSCRIBE_FAILED_MSG = "❌ 订阅失败，请检查 MoviePilot 服务状态或稍后重试。"
+
+# 会话等待超时（秒），同时作为会话状态的过期时间
+_SESSION_TIMEOUT = 60
+# 搜索结果缓存时间（秒）
+_SEARCH_CACHE_TTL = 300
+# 季度列表缓存时间（秒）
+_SEASON_CACHE_TTL = 600
+
+
+def _parse_int(text: str) -> int | None:
+    """
+    解析用户输入的整数，非数字输入直接返回 None 而不抛出异常
+
+    Args:
+        text: 已去除首尾空白的用户输入
+
+    Returns:
+        整数或 None
+    """
+    digits = text[1:] if text[:1] in ("+", "-") else text
+    if not digits.isdecimal():
+        return None
+    return int(text)
 
 
 @register(
@@ -34,45 +111,78 @@ class MoviePilotPlugin(Star):
         super().__init__(context)
         self.config = config
         self.api = MoviepilotApi(config)
-        self.state: dict[str, dict[str, Any]] = {}
-        self.state_lock = asyncio.Lock()
+        # 用户会话状态存储（默认进程内，配置 mp_redis_url 时使用 Redis）
+        self.store = create_store(config)
+        # 搜索结果与季度列表缓存单独存放，缓存淘汰不会影响会话状态
+        self.cache = create_store(config, "查询缓存")
+        # 每个用户一把锁，保护会话状态的读取-修改-写入过程
+        self._user_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # 单次指令等待 MoviePilot 的总时长上限（含重试，0 为不限制）
+        self._api_timeout = config.get("mp_api_timeout", 0)
+
+        # 回复合并：在时间窗口内产生的多条回复合并为一条发送（0 为关闭）
+        self._reply_batch_delay = config.get("mp_reply_batch_delay", 0) / 1000
+        self._outbox: dict[str, tuple[AstrMessageEvent, list[str]]] = {}
+        self._flush_tasks: dict[str, asyncio.Task] = {}
+
+        # 下载进度快照：间隔大于 0 时由后台任务定期刷新，/download 直接读取
+        self._progress_interval = config.get("mp_progress_interval", 0)
+        self._progress: list[dict] | None = None
 
         # 验证配置
-        self._validate_config()
-
-    def _validate_config(self) -> None:
+        self._token_task: asyncio.Task | None = None
+        self._progress_task: asyncio.Task | None = None
+        if self._validate_config():
+            # 后台预取并定期刷新 Token，用户请求无需等待登录
+            self._token_task = asyncio.create_task(self._token_refresher())
+            if self._progress_interval > 0:
+                self._progress_task = asyncio.create_task(self._progress_refresher())
+
+    def _validate_config(self) -> bool:
         """验证配置并在启动时报告问题"""
         valid, error_msg = self.api.validate_config()
         if not valid:
-            logger.error(f"[MoviePilot] 配置错误: {error_msg}")
+            logger.error("[MoviePilot] 配置错误: %s", error_msg)
         else:
             logger.info("[MoviePilot] 配置验证通过")
+        return valid
+
+    async def _token_refresher(self) -> None:
+        """启动时获取 Token，之后在即将过期时自动刷新"""
+        while True:
+            if await self.api.prefetch_token():
+                delay = max(self.api.seconds_until_token_refresh(), 1)
+            else:
+                delay = 60  # 登录失败时稍后重试
+            await asyncio.sleep(delay)
+
+    async def _progress_refresher(self) -> None:
+        """定期刷新下载进度快照"""
+        while True:
+            try:
+                # 获取失败时快照置空，/download 回退到实时查询，避免展示过期数据
+                self._progress = await self._fetch_download_progress()
+            except Exception as e:
+                logger.warning("刷新下载进度失败: %s", e)
+                self._progress = None
+            await asyncio.sleep(self._progress_interval)
+
+    async def terminate(self) -> None:
+        """插件卸载时停止后台任务并释放连接"""
+        if self._token_task:
+            self._token_task.cancel()
+        if self._progress_task:
+            self._progress_task.cancel()
+        for task in self._flush_tasks.values():
+            task.cancel()
+        await self.api.close()
+        await self.store.close()
+        await self.cache.close()
 
     @filter.command("mp_help")
     async def show_help(self, event: AstrMessageEvent):
         """显示帮助信息"""
-        help_text = """📺 MoviePilot 订阅插件使用帮助
-
-📌 可用命令：
-━━━━━━━━━━━━━━━━━━
-/sub <片名>
-  搜索并订阅影片（支持电影和电视剧）
-  示例：/sub 星际穿越
-
-/download
-  查看当前下载进度
-
-/mp_help
-  显示本帮助信息
-━━━━━━━━━━━━━━━━━━
-
-💡 使用提示：
-• 搜索后回复序号进行订阅
-• 回复 0 取消操作
-• 电视剧会自动列出可选季度
-• 搜索超时时间为 60 秒
-"""
-        yield event.plain_result(help_text)
+        yield event.plain_result(_HELP_TEXT)
 
     @filter.command("sub")
     async def subscribe(self, event: AstrMessageEvent, message: str):
@@ -82,26 +192,24 @@ class MoviePilotPlugin(Star):
         Args:
             message: 影片名称
         """
-        # 检查输入
-        if not message or not message.strip():
+        # 检查输入与 API 配置（配置验证结果已缓存）
+        media_name = message.strip() if message else ""
+        valid, error_msg = self.api.validate_config()
+        if not media_name:
             yield event.plain_result("❌ 请输入影片名称，例如：/sub 星际穿越")
             return
-
-        # 检查 API 配置
-        valid, error_msg = self.api.validate_config()
         if not valid:
             yield event.plain_result(f"⚠️ 插件配置错误：{error_msg}\n请联系管理员检查配置。")
             return
 
-        media_name = message.strip()
         user_id = event.get_sender_id()
-        logger.info(f"用户 {user_id} 搜索影片: {media_name}")
+        logger.info("用户 %s 搜索影片: %s", user_id, media_name)
 
         # 搜索影片
         try:
-            movies = await self.api.search_media_info(media_name)
+            movies = await self._with_timeout(self._search_media(media_name))
         except Exception as e:
-            logger.error(f"搜索影片异常: {e}")
+            logger.error("搜索影片异常: %s", e)
             yield event.plain_result("❌ 搜索服务暂时不可用，请稍后重试。")
             return
 
@@ -110,31 +218,78 @@ class MoviePilotPlugin(Star):
             return
 
         # 显示搜索结果
-        result_lines = [
-            "🔍 搜索结果",
-            "━━━━━━━━━━━━━━━━━━",
-            f"共找到 {len(movies)} 部相关影片：",
-            "",
-        ]
-        for i, movie in enumerate(movies, 1):
-            title = movie.get('title', '未知')
-            year = movie.get('year', '')
-            media_type = movie.get('type', '未知')
-            type_icon = "🎬" if media_type == "电影" else "📺"
-            year_str = f" ({year})" if year else ""
-            result_lines.append(f"  {i}. {type_icon} {title}{year_str}")
-        
-        result_lines.extend([
-            "",
-            "💡 提示：回复序号订阅（0 取消）",
-            "━━━━━━━━━━━━━━━━━━",
-        ])
-        result_text = "\n".join(result_lines)
+        header = (
+            "🔍 搜索结果\n"
+            f"{_DIVIDER}\n"
+            f"共找到 {len(movies)} 部相关影片：\n\n"
+        )
+        body = "\n".join(
+            f"  {i}. {'🎬' if movie.get('type') == '电影' else '📺'} "
+            f"{movie.get('title', '未知')}{f' ({year})' if (year := movie.get('year')) else ''}"
+            for i, movie in enumerate(movies, 1)
+        )
+        result_text = header + body + _SEARCH_FOOTER
         yield event.plain_result(result_text)
 
         # 启动会话等待用户选择
         await self._wait_for_movie_selection(event, movies)
 
+    async def _with_timeout(self, aw: Awaitable[T]) -> T:
+        """
+        为 API 调用加上总超时，超时抛出 TimeoutError
+
+        调用方已有的异常处理会向用户返回"请稍后重试"的提示。
+        """
+        if self._api_timeout <= 0:
+            return await aw
+        try:
+            return await asyncio.wait_for(aw, timeout=self._api_timeout)
+        except asyncio.TimeoutError:  # Python 3.10 中与内置 TimeoutError 不同
+            logger.warning("MoviePilot 请求超时 (%s 秒)", self._api_timeout)
+            raise
+
+    async def _search_media(self, media_name: str) -> list[dict] | None:
+        """
+        搜索影片（带缓存，相同关键词在有效期内不再请求 MoviePilot）
+
+        Args:
+            media_name: 影片名称
+
+        Returns:
+            搜索结果列表或 None
+        """
+        key = f"search:{media_name.lower()}"
+        movies = await self.cache.get(key)
+        if movies is not None:
+            logger.debug("使用缓存的搜索结果: %s", media_name)
+            return movies
+
+        movies = await self.api.search_media_info(media_name)
+        if movies:
+            await self.cache.set(key, movies, _SEARCH_CACHE_TTL)
+        return movies
+
+    async def _list_seasons(self, tmdb_id: str | int) -> list[dict] | None:
+        """
+        获取电视剧季度列表（带缓存，按 TMDB ID 缓存）
+
+        Args:
+            tmdb_id: TMDB ID
+
+        Returns:
+            季度列表或 None
+        """
+        key = f"seasons:{tmdb_id}"
+        seasons = await self.cache.get(key)
+        if seasons is not None:
+            logger.debug("使用缓存的季度列表: %s", tmdb_id)
+            return seasons
+
+        seasons = await self.api.list_all_seasons(tmdb_id)
+        if seasons:
+            await self.cache.set(key, seasons, _SEASON_CACHE_TTL)
+        return seasons
+
     async def _wait_for_movie_selection(self, event: AstrMessageEvent, movies: list[dict]) -> None:
         """
         等待用户选择影片
@@ -144,30 +299,49 @@ class MoviePilotPlugin(Star):
             movies: 影片列表
         """
         user_id = event.get_sender_id()
+        # 每次输入都会用到，提前绑定，避免在回调中重复查找属性
+        user_lock = self._user_locks[user_id]
+        process_season_selection = self._process_season_selection
+        process_movie_index_selection = self._process_movie_index_selection
 
-        @session_waiter(timeout=60, record_history_chains=False)
+        # 会话阶段保存在闭包中，不依赖会过期的状态存储
+        waiting_for_season = False
+
+        @session_waiter(timeout=_SESSION_TIMEOUT, record_history_chains=False)
         async def selection_waiter(controller: SessionController, ev: AstrMessageEvent):
+            nonlocal waiting_for_season
             user_input = ev.message_str.strip()
-            current_state = await self._get_user_state(user_id)
-
-            # 处理季度选择状态
-            if current_state.get("waiting_for") == "season":
-                await self._process_season_selection(ev, controller, user_id, user_input)
-                return
-
-            # 处理影片选择
-            await self._process_movie_index_selection(ev, controller, user_id, user_input, movies)
+            # 同一用户的输入依次处理，避免读取与写入状态之间被其他输入打断
+            async with user_lock:
+                # 处理季度选择状态
+                if waiting_for_season:
+                    await process_season_selection(ev, controller, user_id, user_input)
+                    return
+
+                # 处理影片选择
+                waiting_for_season = await process_movie_index_selection(
+                    ev, controller, user_id, user_input, movies
+                )
 
         try:
             await selection_waiter(event)
         except TimeoutError:
-            await event.send(event.plain_result("⏰ 操作超时，已退出选择。"))
+            await self._reply(event, _TIMEOUT_MSG)
         except Exception as e:
-            logger.error(f"会话处理异常: {e}")
-            await event.send(event.plain_result("❌ 发生错误，请重新尝试。"))
+            logger.error("会话处理异常: %s", e)
+            await self._reply(event, _ERROR_MSG)
         finally:
-            await self._clear_user_state(user_id)
-            event.stop_event()
+            # 先清理本插件持有的状态，确保发送失败时状态也不会残留
+            async with user_lock:
+                await self._clear_user_state(user_id)
+            # 会话结束后回收空闲的锁
+            if not user_lock.locked() and self._user_locks.get(user_id) is user_lock:
+                del self._user_locks[user_id]
+            try:
+                await self._flush_replies(event)
+            finally:
+                # 仅标记原始 /sub 事件停止传播，可重复调用
+                event.stop_event()
 
     async def _process_movie_index_selection(
         self,
@@ -176,7 +350,7 @@ class MoviePilotPlugin(Star):
         user_id: str,
         user_input: str,
         movies: list[dict],
-    ) -> None:
+    ) -> bool:
         """
         处理影片索引选择
 
@@ -186,36 +360,40 @@ class MoviePilotPlugin(Star):
             user_id: 用户ID
             user_input: 用户输入
             movies: 影片列表
+
+        Returns:
+            是否进入季度选择阶段
         """
 
-        try:
-            index = int(user_input) - 1
-        except ValueError:
-            await event.send(event.plain_result("⚠️ 请输入有效的数字序号。"))
-            controller.keep(timeout=60, reset_timeout=True)
-            return
+        number = _parse_int(user_input)
+        if number is None:
+            await self._reply(event, "⚠️ 请输入有效的数字序号。")
+            await self._keep_session(controller, user_id)
+            return False
+        index = number - 1
 
         # 用户取消
         if index == -1:
-            await event.send(event.plain_result("❌ 已取消操作。"))
+            await self._reply(event, _CANCEL_MSG)
             controller.stop()
-            return
+            return False
 
         # 验证索引范围
         if not (0 <= index < len(movies)):
-            await event.send(event.plain_result("⚠️ 无效的序号，请输入列表中的数字。"))
-            controller.keep(timeout=60, reset_timeout=True)
-            return
+            await self._reply(event, "⚠️ 无效的序号，请输入列表中的数字。")
+            await self._keep_session(controller, user_id)
+            return False
 
         selected_movie = movies[index]
-        logger.info(f"用户 {user_id} 选择了: {selected_movie.get('title')}")
+        logger.info("用户 %s 选择了: %s", user_id, selected_movie.get('title'))
 
         # 处理电视剧
         if selected_movie.get("type") == "电视剧":
-            await self._handle_tv_series_selection(event, controller, user_id, selected_movie)
-        else:
-            # 处理电影订阅
-            await self._subscribe_movie(event, controller, selected_movie)
+            return await self._handle_tv_series_selection(event, controller, user_id, selected_movie)
+
+        # 处理电影订阅
+        await self._subscribe_movie(event, controller, selected_movie)
+        return False
 
     async def _handle_tv_series_selection(
         self,
@@ -223,7 +401,7 @@ class MoviePilotPlugin(Star):
         controller: SessionController,
         user_id: str,
         movie: dict[str, Any],
-    ) -> None:
+    ) -> bool:
         """
         处理电视剧选择，获取并显示季度列表
 
@@ -232,51 +410,40 @@ class MoviePilotPlugin(Star):
             controller: 会话控制器
             user_id: 用户ID
             movie: 电视剧信息
+
+        Returns:
+            是否进入季度选择阶段
         """
         tmdb_id = movie.get("tmdb_id")
-        if not tmdb_id or str(tmdb_id) in ("tv", "movie"):
-            logger.warning(f"电视剧缺少有效的 TMDB ID: {tmdb_id}")
-            await event.send(event.plain_result("❌ 影片信息不完整，无法获取季度信息。\n这可能是因为该影片缺少 TMDB 信息，建议直接尝试订阅。"))
+        if not tmdb_id or tmdb_id in ("tv", "movie"):
+            logger.warning("电视剧缺少有效的 TMDB ID: %s", tmdb_id)
+            await self._reply(event, "❌ 影片信息不完整，无法获取季度信息。\n这可能是因为该影片缺少 TMDB 信息，建议直接尝试订阅。")
             controller.stop()
-            return
+            return False
 
         # 获取季度列表
         try:
-            seasons = await self.api.list_all_seasons(tmdb_id)
+            seasons = await self._with_timeout(self._list_seasons(tmdb_id))
         except Exception as e:
-            logger.error(f"获取季度列表失败: {e}")
-            await event.send(event.plain_result("❌ 无法获取季度信息，请稍后重试。"))
+            logger.error("获取季度列表失败: %s", e)
+            await self._reply(event, "❌ 无法获取季度信息，请稍后重试。")
             controller.stop()
-            return
+            return False
 
         if not seasons:
-            await event.send(event.plain_result("❌ 没有找到可用的季度信息。"))
+            await self._reply(event, "❌ 没有找到可用的季度信息。")
             controller.stop()
-            return
+            return False
 
         # 显示季度列表
-        result_lines = [
-            f"📺 {movie.get('title', '未知')}",
-            "━━━━━━━━━━━━━━━━━━",
-            "📂 请选择要订阅的季度：",
-            "",
-        ]
-        for s in seasons:
-            season_num = s.get('season_number', '?')
-            season_name = s.get('name', '未命名')
-            # 如果名称就是"第 X 季"，就不重复显示
-            if season_name == f"第 {season_num} 季":
-                result_lines.append(f"  🔹 第 {season_num} 季")
-            else:
-                result_lines.append(f"  🔹 第 {season_num} 季｜{season_name}")
-        
-        result_lines.extend([
-            "",
-            "💡 提示：回复季数数字即可订阅（0 退出）",
-            "━━━━━━━━━━━━━━━━━━",
-        ])
-        result_text = "\n".join(result_lines)
-        await event.send(event.plain_result(result_text))
+        header = (
+            f"📺 {movie.get('title', '未知')}\n"
+            f"{_DIVIDER}\n"
+            "📂 请选择要订阅的季度：\n\n"
+        )
+        body = "\n".join(self._format_season_line(s) for s in seasons)
+        result_text = header + body + _SEASON_FOOTER
+        await self._reply(event, result_text)
 
         # 更新用户状态
         await self._set_user_state(
@@ -284,11 +451,25 @@ class MoviePilotPlugin(Star):
             {
                 "selected_movie": movie,
                 "seasons": seasons,
-                "waiting_for": "season",
+                # 预先构建季数集合，回复时 O(1) 校验
+                "valid_seasons": frozenset(
+                    s.get("season_number") for s in seasons if s.get("season_number") is not None
+                ),
             },
         )
 
-        controller.keep(timeout=60, reset_timeout=True)
+        await self._keep_session(controller, user_id)
+        return True
+
+    @staticmethod
+    def _format_season_line(season: dict[str, Any]) -> str:
+        """格式化季度列表中的一行"""
+        season_num = season.get('season_number', '?')
+        season_name = season.get('name', '未命名')
+        # 如果名称就是"第 X 季"，就不重复显示
+        if season_name == f"第 {season_num} 季":
+            return f"  🔹 第 {season_num} 季"
+        return f"  🔹 第 {season_num} 季｜{season_name}"
 
     async def _process_season_selection(
         self,
@@ -306,62 +487,63 @@ class MoviePilotPlugin(Star):
             user_id: 用户ID
             user_input: 用户输入
         """
-        try:
-            season_number = int(user_input)
-        except ValueError:
-            await event.send(event.plain_result("⚠️ 请输入有效的季数。"))
-            controller.keep(timeout=60, reset_timeout=True)
+        season_number = _parse_int(user_input)
+        if season_number is None:
+            await self._reply(event, "⚠️ 请输入有效的季数。")
+            await self._keep_session(controller, user_id)
             return
 
         # 用户取消
         if season_number == 0:
-            await event.send(event.plain_result("❌ 已取消操作。"))
+            await self._reply(event, _CANCEL_MSG)
             controller.stop()
             return
 
         # 获取用户状态
         state = await self._get_user_state(user_id)
-        selected_movie = state.get("selected_movie", {})
+        selected_movie = state.get("selected_movie") or _EMPTY_DICT
         seasons = state.get("seasons", [])
 
         if not selected_movie or not seasons:
-            await event.send(event.plain_result("❌ 会话已过期，请重新搜索。"))
+            await self._reply(event, "❌ 会话已过期，请重新搜索。")
             controller.stop()
             return
 
         # 验证季度有效性
-        valid_season = any(s.get("season_number") == season_number for s in seasons)
-        if not valid_season:
-            await event.send(event.plain_result("⚠️ 无效的季数，请从列表中选择。"))
-            controller.keep(timeout=60, reset_timeout=True)
+        if season_number not in state.get("valid_seasons", frozenset()):
+            await self._reply(event, "⚠️ 无效的季数，请从列表中选择。")
+            await self._keep_session(controller, user_id)
             return
 
         # 执行订阅
-        logger.info(f"用户 {user_id} 订阅季度: {selected_movie.get('title')} 第{season_number}季")
+        title = selected_movie.get('title')
+        logger.info("用户 %s 订阅季度: %s 第%s季", user_id, title, season_number)
         try:
-            success = await self.api.subscribe_series(selected_movie, season_number)
+            success = await self._with_timeout(
+                self.api.subscribe_series(selected_movie, season_number)
+            )
         except Exception as e:
-            logger.error(f"订阅电视剧失败: {e}")
-            await event.send(event.plain_result("❌ 订阅服务暂时不可用，请稍后重试。"))
+            logger.error("订阅电视剧失败: %s", e)
+            await self._reply(event, _SUBSCRIBE_UNAVAILABLE_MSG)
             controller.stop()
             return
 
         if success:
             result_text = (
                 "✅ 订阅成功！\n"
-                "━━━━━━━━━━━━━━━━━━\n"
+                f"{_DIVIDER}\n"
                 f"📺 类型：电视剧\n"
-                f"🎬 片名：{selected_movie.get('title')}"
+                f"🎬 片名：{title}"
             )
             year = selected_movie.get('year')
             if year:
                 result_text += f" ({year})"
             result_text += f"\n📌 季度：第 {season_number} 季\n"
-            result_text += "━━━━━━━━━━━━━━━━━━"
+            result_text += _DIVIDER
         else:
-            result_text = "❌ 订阅失败，请检查 MoviePilot 服务状态或稍后重试。"
+            result_text = _SUBSCRIBE_FAILED_MSG
 
-        await event.send(event.plain_result(result_text))
+        await self._reply(event, result_text)
         controller.stop()
 
     async def _subscribe_movie(
@@ -379,44 +561,97 @@ class MoviePilotPlugin(Star):
             movie: 电影信息
         """
         try:
-            success = await self.api.subscribe_movie(movie)
+            success = await self._with_timeout(self.api.subscribe_movie(movie))
         except Exception as e:
-            logger.error(f"订阅电影失败: {e}")
-            await event.send(event.plain_result("❌ 订阅服务暂时不可用，请稍后重试。"))
+            logger.error("订阅电影失败: %s", e)
+            await self._reply(event, _SUBSCRIBE_UNAVAILABLE_MSG)
             controller.stop()
             return
 
         if success:
             result_text = (
                 "✅ 订阅成功！\n"
-                "━━━━━━━━━━━━━━━━━━\n"
+                f"{_DIVIDER}\n"
                 "📺 类型：电影\n"
                 f"🎬 片名：{movie.get('title')}"
             )
             year = movie.get('year')
             if year:
                 result_text += f" ({year})"
-            result_text += "\n━━━━━━━━━━━━━━━━━━"
+            result_text += "\n" + _DIVIDER
         else:
-            result_text = "❌ 订阅失败，请检查 MoviePilot 服务状态或稍后重试。"
+            result_text = _SUBSCRIBE_FAILED_MSG
 
-        await event.send(event.plain_result(result_text))
+        await self._reply(event, result_text)
         controller.stop()
 
+    async def _reply(self, event: AstrMessageEvent, text: str) -> None:
+        """
+        向用户发送纯文本消息
+
+        开启 mp_reply_batch_delay 时先放入发件箱，窗口结束后与同一会话的
+        其他回复合并为一条消息发送。
+        """
+        if self._reply_batch_delay <= 0:
+            await event.send(event.plain_result(text))
+            return
+
+        key = event.unified_msg_origin
+        entry = self._outbox.get(key)
+        if entry is None:
+            self._outbox[key] = (event, [text])
+            self._flush_tasks[key] = asyncio.create_task(self._delayed_flush(key))
+        else:
+            chunks = entry[1]
+            chunks.append(text)
+            self._outbox[key] = (event, chunks)
+
+    async def _delayed_flush(self, key: str) -> None:
+        """等待合并窗口结束后发送发件箱中的回复"""
+        await asyncio.sleep(self._reply_batch_delay)
+        self._flush_tasks.pop(key, None)
+        try:
+            await self._send_outbox(key)
+        except Exception as e:
+            # 后台任务的异常无人获取，在此记录，避免回复静默丢失
+            logger.error("发送合并回复失败: %s", e)
+
+    async def _flush_replies(self, event: AstrMessageEvent) -> None:
+        """立即发送该会话尚未发出的回复（会话结束前调用）"""
+        key = event.unified_msg_origin
+        task = self._flush_tasks.pop(key, None)
+        if task:
+            task.cancel()
+        await self._send_outbox(key)
+
+    async def _send_outbox(self, key: str) -> None:
+        """合并并发送发件箱中的回复"""
+        entry = self._outbox.pop(key, None)
+        if entry:
+            event, chunks = entry
+            await event.send(event.plain_result("\n".join(chunks)))
+
+    async def _keep_session(self, controller: SessionController, user_id: str) -> None:
+        """延长会话等待时间，并同步刷新用户状态的过期时间"""
+        controller.keep(timeout=_SESSION_TIMEOUT, reset_timeout=True)
+        await self.store.touch(f"state:{user_id}", _SESSION_TIMEOUT)
+
     async def _get_user_state(self, user_id: str) -> dict[str, Any]:
-        """获取用户状态（线程安全）"""
-        async with self.state_lock:
-            return self.state.get(user_id, {}).copy()
+        """获取用户状态（只读，调用方不应修改返回值）"""
+        state = await self.store.get(f"state:{user_id}") or {}
+        # Redis 中集合以列表形式保存，读取后还原为集合
+        valid_seasons = state.get("valid_seasons")
+        if valid_seasons is not None and not isinstance(valid_seasons, frozenset):
+            state["valid_seasons"] = frozenset(valid_seasons)
+        return state
 
     async def _set_user_state(self, user_id: str, state: dict[str, Any]) -> None:
-        """设置用户状态（线程安全）"""
-        async with self.state_lock:
-            self.state[user_id] = state
+        """设置用户状态，过期时间与会话超时一致"""
+        await self.store.set(f"state:{user_id}", state, _SESSION_TIMEOUT)
 
     async def _clear_user_state(self, user_id: str) -> None:
-        """清除用户状态（线程安全）"""
-        async with self.state_lock:
-            self.state.pop(user_id, None)
+        """清除用户状态"""
+        await self.store.delete(f"state:{user_id}")
 
     @filter.command("download")
     async def show_download_progress(self, event: AstrMessageEvent):
@@ -428,9 +663,11 @@ class MoviePilotPlugin(Star):
             return
 
         try:
-            progress_data = await self.api.get_download_progress()
+            progress_data = self._progress
+            if progress_data is None:
+                progress_data = await self._with_timeout(self._fetch_download_progress())
         except Exception as e:
-            logger.error(f"获取下载进度异常: {e}")
+            logger.error("获取下载进度异常: %s", e)
             yield event.plain_result("❌ 获取下载进度失败，请稍后重试。")
             return
 
@@ -443,42 +680,63 @@ class MoviePilotPlugin(Star):
             return
 
         # 格式化下载进度
-        result_lines = [f"📥 当前下载任务 ({len(progress_data)} 个)\n" + "=" * 30]
-
-        for task in progress_data:
-            media = task.get("media", {})
-            title = media.get("title") or task.get("title", "未知")
-            season = media.get("season", "")
-            episode = media.get("episode", "")
-            progress = task.get("progress", 0)
-            state = task.get("state", "unknown")
-            speed = task.get("speed", "")
-
-            # 进度条
-            bar_length = 20
-            filled = int(bar_length * progress / 100)
-            bar = "█" * filled + "░" * (bar_length - filled)
-
-            # 状态图标
-            state_icon = {
-                "downloading": "⬇️",
-                "seeding": "✅",
-                "paused": "⏸️",
-                "error": "❌",
-                "unknown": "❓",
-            }.get(state.lower(), "❓")
-
-            # 格式化任务信息
-            task_line = f"{state_icon} {title}"
-            if season:
-                task_line += f" {season}"
-            if episode:
-                task_line += f" {episode}"
-
-            result_lines.append(f"\n{task_line}")
-            result_lines.append(f"   [{bar}] {progress:.1f}%")
-            if speed:
-                result_lines.append(f"   💨 {speed}")
-
-        result_lines.append("\n" + "=" * 30)
-        yield event.plain_result("\n".join(result_lines))
+        header = f"📥 当前下载任务 ({len(progress_data)} 个)\n" + _PROGRESS_RULE
+        body = "\n".join(map(self._format_download_task, progress_data))
+        yield event.plain_result(header + "\n" + body + "\n\n" + _PROGRESS_RULE)
+
+    async def _fetch_download_progress(self) -> list[dict] | None:
+        """
+        获取下载进度
+
+        开启 mp_hedged_progress 时同时发起两次请求，采用最先成功返回的结果，
+        以降低 MoviePilot 偶发慢响应带来的等待。
+
+        Returns:
+            下载任务列表或 None
+        """
+        if not self.config.get("mp_hedged_progress", False):
+            return await self.api.get_download_progress()
+
+        pending = {asyncio.create_task(self.api.get_download_progress()) for _ in range(2)}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result is not None:
+                        return result
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _format_download_task(task: dict[str, Any]) -> str:
+        """格式化单个下载任务（包含进度条与速度）"""
+        # 绑定到局部变量，减少循环中的属性查找
+        get = task.get
+        media = get("media") or _EMPTY_DICT
+        media_get = media.get
+        title = media_get("title") or get("title", "未知")
+        season = media_get("season", "")
+        episode = media_get("episode", "")
+        progress = get("progress", 0)
+        state = get("state", "unknown")
+        speed = get("speed", "")
+
+        # 进度条
+        filled = min(max(int(_BAR_LENGTH * progress / 100), 0), _BAR_LENGTH)
+        bar = _BARS[filled]
+
+        # 格式化任务信息
+        parts = [_STATE_ICON.get(state.lower(), "❓"), str(title)]
+        if season:
+            parts.append(str(season))
+        if episode:
+            parts.append(str(episode))
+        task_line = " ".join(parts)
+
+        text = f"\n{task_line}\n   [{bar}] {progress:.1f}%"
+        if speed:
+            text += f"\n   💨 {speed}"
+        return text
@@ -0,0 +1,169 @@
+"""
+键值存储模块
+
+为用户会话状态与查询缓存提供带过期时间的存储后端：
+- MemoryStore：进程内存储（默认）
+- RedisStore：基于 Redis 的外部存储，支持多实例部署与重启后保留状态
+"""
+
+from typing import Any
+from astrbot.api import logger
+import time
+
+
+def _json_default(obj: Any) -> Any:
+    """将集合类型序列化为列表"""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"无法序列化类型: {type(obj).__name__}")
+
+
+try:
+    import orjson
+
+    def _dumps(value: Any) -> bytes:
+        return orjson.dumps(value, default=_json_default)
+
+    _loads = orjson.loads
+except ImportError:  # orjson 为可选依赖，未安装时回退到标准库
+    import json
+
+    def _dumps(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+    _loads = json.loads
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis 为可选依赖，仅在配置 mp_redis_url 时需要
+    aioredis = None
+
+
+class MemoryStore:
+    """进程内键值存储（带过期时间）"""
+
+    def __init__(self, maxsize: int = 1024):
+        """
+        初始化存储
+
+        Args:
+            maxsize: 最大条目数，超出时淘汰最早写入的条目
+        """
+        self.maxsize = maxsize
+        self._data: dict[str, tuple[float, Any]] = {}
+
+    async def get(self, key: str) -> Any | None:
+        """读取未过期的值，不存在或已过期时返回 None"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if time.monotonic() >= expires_at:
+            self._data.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """写入值并设置过期时间（秒）"""
+        self._data.pop(key, None)
+        self._data[key] = (time.monotonic() + ttl, value)
+        if len(self._data) > self.maxsize:
+            self._evict()
+
+    async def touch(self, key: str, ttl: float) -> None:
+        """刷新已有值的过期时间（秒），不存在或已过期时忽略"""
+        value = await self.get(key)
+        if value is not None:
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    async def delete(self, key: str) -> None:
+        """删除值"""
+        self._data.pop(key, None)
+
+    async def close(self) -> None:
+        """释放资源"""
+        self._data.clear()
+
+    def _evict(self) -> None:
+        """先清理过期条目，仍超出上限时淘汰最早写入的条目"""
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._data.items() if now >= expires_at]:
+            del self._data[key]
+        while len(self._data) > self.maxsize:
+            del self._data[next(iter(self._data))]
+
+
+class RedisStore:
+    """基于 Redis 的键值存储，值以 JSON 序列化"""
+
+    def __init__(self, url: str, prefix: str = "mpsub:"):
+        """
+        初始化存储
+
+        Args:
+            url: Redis 连接地址，例如 redis://localhost:6379/0
+            prefix: 键前缀
+        """
+        self.prefix = prefix
+        self._redis = aioredis.from_url(url)
+
+    async def get(self, key: str) -> Any | None:
+        """读取值，不存在或 Redis 不可用时返回 None"""
+        try:
+            raw = await self._redis.get(self.prefix + key)
+        except Exception as e:
+            logger.warning("读取 Redis 失败: %s", e)
+            return None
+        return _loads(raw) if raw else None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """写入值并设置过期时间（秒）"""
+        try:
+            await self._redis.setex(
+                self.prefix + key,
+                max(int(ttl), 1),
+                _dumps(value),
+            )
+        except Exception as e:
+            logger.warning("写入 Redis 失败: %s", e)
+
+    async def touch(self, key: str, ttl: float) -> None:
+        """刷新已有值的过期时间（秒），不存在时忽略"""
+        try:
+            await self._redis.expire(self.prefix + key, max(int(ttl), 1))
+        except Exception as e:
+            logger.warning("刷新 Redis 过期时间失败: %s", e)
+
+    async def delete(self, key: str) -> None:
+        """删除值"""
+        try:
+            await self._redis.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning("删除 Redis 键失败: %s", e)
+
+    async def close(self) -> None:
+        """关闭 Redis 连接"""
+        await self._redis.aclose()
+
+
+def create_store(config: dict[str, Any], usage: str = "会话状态") -> MemoryStore | RedisStore:
+    """
+    根据配置创建存储后端
+
+    会话状态与缓存应使用各自的实例，避免进程内存储淘汰缓存时误删会话状态。
+
+    Args:
+        config: 配置字典，mp_redis_url 非空时使用 Redis
+        usage: 存储用途，仅用于日志
+
+    Returns:
+        存储实例
+    """
+    redis_url = config.get("mp_redis_url", "")
+    if not redis_url:
+        return MemoryStore()
+    if aioredis is None:
+        logger.error("[MoviePilot] 已配置 mp_redis_url 但未安装 redis 依赖，使用进程内存储")
+        return MemoryStore()
+    logger.info("[MoviePilot] 使用 Redis 存储%s", usage)
+    return RedisStore(redis_url)